@@ -0,0 +1,155 @@
+"""
+
+Dieses Modul beinhaltet die Kernfunktionen der Schlüsselsuche für die lineare und
+differentielle Kryptanalyse. Für jede Schlüsselvermutung werden die Textpaare partiell
+entschlüsselt und gezählt, wie oft die Charakteristik erfüllt ist.
+
+Falls Numba installiert ist, werden die Funktionen just-in-time kompiliert und die
+Schlüsselvermutungen parallel getestet. Andernfalls wird auf eine Umsetzung mit NumPy
+zurückgegriffen, welche dieselben Argumente und Rückgabewerte besitzt und die Schlüssel-
+vermutungen blockweise in Matrixoperationen testet, sodass der Speicherbedarf beschränkt bleibt.
+
+"""
+
+from functools import lru_cache
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Anzahl Schlüsselvermutungen, welche ohne Numba gleichzeitig getestet werden
+GUESS_BLOCK = 256
+
+
+def set_num_threads(num_threads):
+    """
+    Begrenzt die Anzahl Threads, welche die parallelen Kernfunktionen
+    verwenden. Dies wird in Pool-Prozessen aufgerufen, damit mehrere
+    Prozesse nicht jeweils alle Kerne belegen. Ohne Numba hat diese
+    Funktion keine Wirkung.
+    """
+    if HAS_NUMBA:
+        numba.set_num_threads(num_threads)
+
+
+@lru_cache(maxsize=64)
+def parity_table(mask):
+    """
+    Erstellt eine Lookup-Tabelle, welche für alle 2^16 Zustände x die
+    Parität von (mask & x) als uint8 enthält. Damit wird die Parität
+    in den Kernfunktionen durch einen einzigen Tabellenzugriff bestimmt.
+    Da dieselben Masken bei jedem Angriff wieder vorkommen, werden die
+    Tabellen zwischengespeichert und sind deshalb schreibgeschützt.
+
+    Args:
+        mask: Eingabe- oder Ausgabemaske
+    """
+    states = np.arange(1 << 16, dtype=np.uint16)
+    table = (np.bitwise_count(states & np.uint16(mask)) & 1).astype(np.uint8)
+    table.flags.writeable = False
+    return table
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _best_guess(counts, guesses):
+        """
+        Gibt die erste Schlüsselvermutung mit der höchsten Anzahl
+        Treffer und diese Anzahl zurück.
+        """
+        best = 0
+        for guess in range(1, len(counts)):
+            if counts[guess] > counts[best]:
+                best = guess
+        return guesses[best], counts[best]
+
+    @njit(cache=True, parallel=True)
+    def search_linear(ct, pt, inv_lut, par_alpha, par_beta, guesses):
+        """
+        Zählt für jede Schlüsselvermutung die Textpaare, bei welchen die
+        Parität der maskierten Eingabe mit der Parität der maskierten,
+        partiell entschlüsselten Ausgabe übereinstimmt. Die Paritäten
+        werden aus den Tabellen par_alpha und par_beta gelesen, wobei par_beta
+        vorab mit der inversen S-Box zu einer einzigen Tabelle verknüpft wird.
+
+        Zurückgegeben werden die beste Schlüsselvermutung und deren Anzahl Treffer.
+        """
+        in_parity = par_alpha[pt]
+        out_parity = par_beta[inv_lut]
+        counts = np.zeros(len(guesses), dtype=np.int64)
+        for guess in prange(len(guesses)):
+            key_guess = guesses[guess]
+            count = 0
+            for i in range(len(ct)):
+                if in_parity[i] == out_parity[ct[i] ^ key_guess]:
+                    count += 1
+            counts[guess] = count
+        return _best_guess(counts, guesses)
+
+    @njit(cache=True, parallel=True)
+    def search_differential(ct, ct_alpha, inv_lut, beta, guesses):
+        """
+        Zählt für jede Schlüsselvermutung die Textpaare, deren partiell
+        entschlüsselte Ausgabedifferenz der Ausgabedifferenz beta entspricht.
+
+        Zurückgegeben werden die beste Schlüsselvermutung und deren Anzahl Treffer.
+        """
+        counts = np.zeros(len(guesses), dtype=np.int64)
+        for guess in prange(len(guesses)):
+            key_guess = guesses[guess]
+            count = 0
+            for i in range(len(ct)):
+                dy = inv_lut[ct[i] ^ key_guess] ^ inv_lut[ct_alpha[i] ^ key_guess]
+                if dy == beta:
+                    count += 1
+            counts[guess] = count
+        return _best_guess(counts, guesses)
+
+else:
+    def search_linear(ct, pt, inv_lut, par_alpha, par_beta, guesses):
+        """
+        Zählt für jede Schlüsselvermutung die Textpaare, bei welchen die
+        Parität der maskierten Eingabe mit der Parität der maskierten,
+        partiell entschlüsselten Ausgabe übereinstimmt. Die Paritäten
+        werden aus den Tabellen par_alpha und par_beta gelesen, wobei par_beta
+        vorab mit der inversen S-Box zu einer einzigen Tabelle verknüpft wird.
+
+        Die Schlüsselvermutungen werden in Blöcken von GUESS_BLOCK Vermutungen
+        als Matrix der Form (Anzahl Vermutungen, Anzahl Textpaare) verarbeitet.
+
+        Zurückgegeben werden die beste Schlüsselvermutung und deren Anzahl Treffer.
+        """
+        in_parity = par_alpha[pt]
+        out_parity = par_beta[inv_lut]
+        best_guess, best_count = int(guesses[0]), -1
+        for start in range(0, len(guesses), GUESS_BLOCK):
+            block = guesses[start:start + GUESS_BLOCK]
+            counts = np.count_nonzero(out_parity[ct[None, :] ^ block[:, None]] == in_parity, axis=1)
+            best = int(np.argmax(counts))
+            if counts[best] > best_count:
+                best_guess, best_count = int(block[best]), int(counts[best])
+        return best_guess, best_count
+
+    def search_differential(ct, ct_alpha, inv_lut, beta, guesses):
+        """
+        Zählt für jede Schlüsselvermutung die Textpaare, deren partiell
+        entschlüsselte Ausgabedifferenz der Ausgabedifferenz beta entspricht.
+
+        Die Schlüsselvermutungen werden in Blöcken von GUESS_BLOCK Vermutungen
+        als Matrix der Form (Anzahl Vermutungen, Anzahl Textpaare) verarbeitet.
+
+        Zurückgegeben werden die beste Schlüsselvermutung und deren Anzahl Treffer.
+        """
+        best_guess, best_count = int(guesses[0]), -1
+        for start in range(0, len(guesses), GUESS_BLOCK):
+            block = guesses[start:start + GUESS_BLOCK]
+            dy = inv_lut[ct[None, :] ^ block[:, None]] ^ inv_lut[ct_alpha[None, :] ^ block[:, None]]
+            counts = np.count_nonzero(dy == beta, axis=1)
+            best = int(np.argmax(counts))
+            if counts[best] > best_count:
+                best_guess, best_count = int(block[best]), int(counts[best])
+        return best_guess, best_count
@@ -5,6 +5,10 @@ Es nutzt das aus der Klasse FrameworkProvider hergestellte Framework.
 
 """
 
+import numpy as np
+from multiprocessing import cpu_count, get_context
+from cryptanalysis._kernel import search_linear, search_differential, set_num_threads, parity_table
+
 
 class Cryptanalysis:
     def __init__(self, framework):
@@ -16,44 +20,22 @@ class Cryptanalysis:
         self.framework = framework
         self.spn = framework.spn
         self.variant = framework.variant
+        self.inv_sbox16 = np.asarray(self.spn.inv_sbox16, dtype=np.uint16)
 
-    def _partially_decrypt(self, samples, key_guess):
+    def _key_guesses(self, active_bits):
         """
-        Diese Hilfsmethode führt eine partielle Entschlüsselung
-        mit den vom FrameworkProvider hergestellten Textpaare
-        der letzten Runde durch.
+        Diese Hilfsmethode erstellt einmalig alle 2^len(active_bits) Schlüssel-
+        vermutungen als uint16-Array, wobei alle Zwischenschritte in uint16
+        berechnet werden. Das i-te Bit des Index einer Vermutung
+        bestimmt dabei das Schlüsselbit an der Position active_bits[i].
 
-        Danach werden die Textpaare, bzw. Zwischentextpaare als Liste
-        zurückgegeben, die zur Analyse verwendet werden.
+        Args:
+            active_bits: Bitpositionen der aktiven Schlüsselbits
         """
-        if self.variant == 'linear':
-            plaintexts = []
-            partially_decrypted_ciphertexts = []
-
-            for pt, ct in samples:
-                state = ct ^ key_guess
-                state = self.spn._inv_substitution(state)
-
-                plaintexts.append(pt)
-                partially_decrypted_ciphertexts.append(state)
-            return plaintexts, partially_decrypted_ciphertexts
-
-        if self.variant == 'differential':
-            partially_decrypted_ciphertexts = []
-            partially_decrypted_ciphertexts_alpha = []
-
-            for sample in samples:
-                (ct, ct_alpha) = sample
-                state = ct ^ key_guess
-                state_alpha = ct_alpha ^ key_guess
-
-                state = self.spn._inv_substitution(state)
-                state_alpha = self.spn._inv_substitution(state_alpha)
-
-                partially_decrypted_ciphertexts.append(state)
-                partially_decrypted_ciphertexts_alpha.append(state_alpha)
-                
-            return partially_decrypted_ciphertexts, partially_decrypted_ciphertexts_alpha
+        masks = np.left_shift(np.uint16(1), np.array(active_bits, dtype=np.uint16))
+        indices = np.arange(1 << len(active_bits), dtype=np.uint16)
+        selected = (indices[:, None] >> np.arange(len(active_bits), dtype=np.uint16)) & np.uint16(1)
+        return np.bitwise_or.reduce(selected * masks, axis=1)
 
     def _find_key_bits(self, alpha, beta, attack_samples, show_results=False):
         """
@@ -65,55 +47,48 @@ class Cryptanalysis:
         zugeordnet, sodass anschliessend der Schlüsselkandidat mit höchstem Wert aus-
         gewählt werden kann.
 
+        Die Textpaare liegen als parallele NumPy-Arrays vor (LinearSamples, bzw. DiffSamples),
+        welche direkt an die Kernfunktionen search_linear, bzw. search_differential übergeben
+        werden, in welchen die Suche über alle Schlüsselvermutungen durchgeführt wird.
+
         Zurückgegeben werden die ausfindig gemachten Schlüsselbits (recovered_bits)
         und das Mass deren Qualität (bias_max, bzw. prob_max).
 
         Args:
             alpha: Eingabemaske, bzw. Eingabedifferenz
             beta: Ausgabemaske, bzw. Ausgabedifferenz
-            attack_samples: Die zu testenden Textpaare
+            attack_samples: Die zu testenden Textpaare (LinearSamples, bzw. DiffSamples)
             show_results: optionale Ausgabe der Zwischenresultate
         """
-        active_bits = list(self.framework.get_target_partial_subkey(beta))
+        mask, active_bits = self.framework.get_target_partial_subkey(beta)
+        guesses = self._key_guesses(active_bits)
+        N = len(attack_samples.ct)
 
         best_key_guess = 0
         bias_max = 0
         prob_max = 0
 
-        for guess in range(1 << len(active_bits)):
-            key_guess = 0
-            for i, bit_pos in enumerate(active_bits):
-                if (guess >> i) & 1:
-                    key_guess |= (1 << bit_pos)
-
-            count = 0
-
-            if self.variant == 'linear':
-                for pt, partial_ct in zip(*self._partially_decrypt(attack_samples, key_guess)):
-                    in_parity = bin(alpha & pt).count("1") % 2
-                    out_parity = bin(beta & partial_ct).count("1") % 2
-                    if in_parity == out_parity:
-                        count += 1
+        if self.variant == 'linear':
+            pt_arr, ct_arr = attack_samples
+            par_alpha = parity_table(alpha)
+            par_beta = parity_table(beta)
+            key_guess, count = search_linear(ct_arr, pt_arr, self.inv_sbox16, par_alpha, par_beta, guesses)
 
-                N = len(attack_samples)
-                bias_key = (count / N) - 0.5
+            bias_key = (count / N) - 0.5
 
-                if bias_key > bias_max:
-                    bias_max = bias_key
-                    best_key_guess = key_guess
+            if bias_key > bias_max:
+                bias_max = bias_key
+                best_key_guess = key_guess
 
-            if self.variant == 'differential':
-                for partial_ct, partial_ct_alpha in zip(*self._partially_decrypt(attack_samples, key_guess)):
-                    dy = partial_ct ^ partial_ct_alpha
-                    if dy == beta:
-                        count += 1
+        if self.variant == 'differential':
+            ct_arr, ct_alpha_arr = attack_samples
+            key_guess, count = search_differential(ct_arr, ct_alpha_arr, self.inv_sbox16, np.uint16(beta), guesses)
 
-                N = len(attack_samples)
-                prob_key = count / N
+            prob_key = count / N
 
-                if prob_key > prob_max:
-                    prob_max = prob_key
-                    best_key_guess = key_guess
+            if prob_key > prob_max:
+                prob_max = prob_key
+                best_key_guess = key_guess
 
         recovered_bits = {}
 
@@ -122,16 +97,31 @@ class Cryptanalysis:
 
         if show_results:
             if self.variant == 'linear':
-                print(f"target partial subkey: {active_bits}, best guess: {best_key_guess:04x} with bias: {bias_max:.10f}")
+                print(f"target partial subkey: {mask:04x} {active_bits}, best guess: {best_key_guess:04x} with bias: {bias_max:.10f}")
             if self.variant == 'differential':
-                print(f"target partial subkey: {active_bits}, best guess: {best_key_guess:04x} with prob: {prob_max:.10f}")
+                print(f"target partial subkey: {mask:04x} {active_bits}, best guess: {best_key_guess:04x} with prob: {prob_max:.10f}")
 
         if self.variant == 'linear':
             return recovered_bits, bias_max
         if self.variant == 'differential':
             return recovered_bits, prob_max
 
-    def find_last_round_key(self, num_attack_samples):
+    def _find_key_bits_wrapper(self, task):
+        """
+        Diese Hilfsmethode generiert für eine Charakteristik die Textpaare und
+        führt anschliessend _find_key_bits durch. Sie wird in den Prozessen
+        des Pools aufgerufen, sodass auch die Verschlüsselung parallel erfolgt.
+        Jede Aufgabe erhält einen eigenen Zufallszahlengenerator, da die Kopien
+        des Frameworks in den Prozessen denselben Zustand besitzen.
+
+        Args:
+            task: Tupel (alpha, beta, num_attack_samples, rng)
+        """
+        alpha, beta, num_attack_samples, rng = task
+        attack_samples = self.framework.generate_samples(num_attack_samples, alpha, rng)
+        return self._find_key_bits(alpha, beta, attack_samples)
+
+    def find_last_round_key(self, num_attack_samples, parallel=False):
         """
         Diese Methode führt die lineare, bzw. differentielle Analyse für mehrere Charakteristiken
         durch und rekonstruiert den gesamten letzten Rundenschlüssel unter Kombination der
@@ -139,6 +129,13 @@ class Cryptanalysis:
         wobei danach für jede Charakteristik Textpaare zur Analyse und die aktiven Schlüsselbits
         bestimmt werden. Danach wird mit der Hilfsmethode _find_key_bits die Analyse mit jeder
         Charakteristik durchgeführt und die gefundenen Schlüsselbits werden in einem Set gespeichert.
+        Da die Charakteristiken voneinander unabhängig sind, können sie optional parallel in einem
+        Pool mit einem Prozess pro Charakteristik analysiert werden, wobei die Kerne unter den
+        Prozessen aufgeteilt werden. Da die Kernfunktionen bereits selbst parallelisiert sind, bringt
+        dies kaum einen Vorteil, weshalb die Analyse standardmässig seriell erfolgt. Der Pool startet
+        seine Prozesse mit 'spawn', da ein Fork nach der Initialisierung der Numba-Threads hängen
+        bleiben kann. Aufrufende Skripte müssen deshalb den Aufruf mit
+        if __name__ == '__main__': schützen.
 
         Danach wird der Schlüssel rekonstruiert, indem die gefundenen Schlüsselbits zusammengesetzt
         werden. Falls mehrere Resultate für eine Schlüssel-Bitposition vorbestehen, wird das Resultat
@@ -148,14 +145,47 @@ class Cryptanalysis:
 
         Args:
             num_attack_samples: Anzahl zu testender Textpaare
+            parallel: Analyse der Charakteristiken in separaten Prozessen; darf nicht aktiviert
+                werden, falls die Methode bereits in einem Pool-Prozess aufgerufen wird
         """
         characteristics = self.framework.generate_characteristics()
-        recovered_key_bits = {}
+        rngs = self.framework.rng.spawn(len(characteristics))
+        tasks = [(alpha, beta, num_attack_samples, rng) for (alpha, beta, _), rng in zip(characteristics, rngs)]
+
+        if parallel:
+            num_threads = max(1, cpu_count() // len(tasks))
+            with get_context('spawn').Pool(processes=len(tasks), initializer=set_num_threads, initargs=(num_threads,)) as pool:
+                results = pool.map(self._find_key_bits_wrapper, tasks)
+        else:
+            results = [self._find_key_bits_wrapper(task) for task in tasks]
+
+        return self._combine_key_bits(results)
+
+    def find_last_round_key_from_samples(self, samples_per_char):
+        """
+        Diese Methode rekonstruiert den letzten Rundenschlüssel wie find_last_round_key,
+        verwendet jedoch bereits bekannte Charakteristiken und vorab generierte Textpaare.
+        Dadurch können dieselben Textpaare für mehrere Angriffe wiederverwendet werden,
+        ohne dass Charakteristiken gesucht und Klartexte verschlüsselt werden müssen.
 
-        for alpha, beta, _ in characteristics:
-            attack_samples = self.framework.generate_samples(num_attack_samples, alpha)
-            key_bit_guesses, bias_key = self._find_key_bits(alpha, beta, attack_samples)
+        Args:
+            samples_per_char: Liste mit Tripeln (alpha, beta, attack_samples)
+        """
+        results = [self._find_key_bits(alpha, beta, attack_samples) for alpha, beta, attack_samples in samples_per_char]
+        return self._combine_key_bits(results)
+
+    def _combine_key_bits(self, results):
+        """
+        Diese Hilfsmethode setzt die für jede Charakteristik gefundenen Schlüsselbits
+        zum letzten Rundenschlüssel zusammen. Falls mehrere Resultate für eine Schlüssel-
+        Bitposition vorbestehen, wird das Resultat mit höherer Qualität übernommen.
+
+        Args:
+            results: Liste der Rückgabewerte von _find_key_bits
+        """
+        recovered_key_bits = {}
 
+        for key_bit_guesses, bias_key in results:
             for bit_pos, bit_value in key_bit_guesses.items():
                 if bit_pos not in recovered_key_bits:
                     recovered_key_bits[bit_pos] = (bit_value, bias_key)
@@ -1,4 +1,5 @@
-import random
+from typing import NamedTuple
+import numpy as np
 from cryptanalysis.searcher import CharacteristicSearcher
 
 """
@@ -9,6 +10,25 @@ Informationen und Ressourcen für die spätere Kryptoanalyse bereitstellt.
 """
 
 
+class LinearSamples(NamedTuple):
+    """
+    Textpaare der linearen Analyse als zwei parallele uint16-Arrays
+    der Klartexte (pt) und der zugehörigen Geheimtexte (ct).
+    """
+    pt: np.ndarray
+    ct: np.ndarray
+
+
+class DiffSamples(NamedTuple):
+    """
+    Textpaare der differentiellen Analyse als zwei parallele uint16-Arrays
+    der Geheimtexte (ct) und der Geheimtexte der um alpha veränderten
+    Klartexte (ct_alpha).
+    """
+    ct: np.ndarray
+    ct_alpha: np.ndarray
+
+
 class FrameworkProvider:
     """
     Diese Klasse bietet Hilfsfunktionen für die Kryptanalyse des SPN.
@@ -17,7 +37,7 @@ class FrameworkProvider:
     werden, sodass alle Schlüsselbits des letzten Rundenschlüssels abgedeckt
     sind und eine beliebige Anzahl an Textpaaren generiert werden.
     """
-    def __init__(self, spn, num_rounds_char, variant = 'linear', max_active_sboxes: int = None):
+    def __init__(self, spn, num_rounds_char, variant = 'linear', max_active_sboxes: int = None, seed=None):
         """
         Initialisiert den FrameworkProvider.
 
@@ -26,12 +46,14 @@ class FrameworkProvider:
             num_rounds_char: Anzahl der Runden, für welche Charakteristiken gesucht werden sollen.
             variant: Art der Analyse; linear oder differentiell.
             max_active_sboxes: optionales Limit für aktive S-Boxen bei Charakteristik Generierung
+            seed: optionaler Startwert des Zufallszahlengenerators für die Textpaare
         """
         self.spn = spn
         self.num_rounds_char = num_rounds_char
         self.variant = variant
         assert variant in ('linear', 'differential')
         self.max_active_sboxes = max_active_sboxes
+        self.rng = np.random.default_rng(seed)
 
     def get_target_partial_subkey(self, beta: int):
         """
@@ -39,22 +61,22 @@ class FrameworkProvider:
         basierend auf der Ausgabemaske, bzw. Ausgabedifferenz der Charakteristik.
         Dazu wird analysiert, welche S-Boxen in der letzten Runde aktiv sind.
         Falls eine S-Box aktiv ist, werden die entsprechenden Bitstellen (von
-        rechts gezählt) des aktiven Eingabenibbles der S-Box in einer Menge
-        gesammelt. Diese Menge der aktiven Schlüsselbits wird am Ende zurück-
-        gegeben.
+        rechts gezählt) des aktiven Eingabenibbles der S-Box in einer Bitmaske
+        gesetzt. Zurückgegeben werden die Bitmaske und die aufsteigend sortierte
+        Liste der aktiven Schlüsselbits, sodass deren Reihenfolge eindeutig ist.
 
         Args:
             beta: Ausgabemaske/Ausgabedifferenz
         """
-        affected_key_bits = set()
+        mask = 0
 
         for sbox_index in range(4):
             nibble_mask = (beta >> (sbox_index * 4)) & 0xF
             if nibble_mask != 0:
-                for bit in range(4):
-                    bit_position = sbox_index * 4 + bit
-                    affected_key_bits.add(bit_position)
-        return affected_key_bits
+                mask |= 0xF << (sbox_index * 4)
+
+        active_bits = [bit_position for bit_position in range(16) if (mask >> bit_position) & 1]
+        return mask, active_bits
 
     def generate_characteristics(self):
         """
@@ -67,6 +89,9 @@ class FrameworkProvider:
         Die Charakteristiken werden als Tripel der Form (Eingabemaske, Ausgabemaske, Bias),
         bzw. (Eingabedifferenz, Ausgabedifferenz, Wahrscheinlichkeit) in einer Liste ge-
         sammelt und zurückgegeben.
+
+        Da bei linearer Variante nur Approximationen mit positivem Bias gesucht werden,
+        wird ein ValueError ausgelöst, falls für ein Nibble keine Charakteristik existiert.
         """
         masks = []
 
@@ -75,35 +100,37 @@ class FrameworkProvider:
             searcher.add_mandatory_nibble([i])
             found = searcher.search_best_characteristic(num_solutions=1, show_results=False)
 
+            if not found:
+                raise ValueError(f"Keine Charakteristik gefunden, bei welcher Nibble {i} in der letzten Runde aktiv ist.")
+
             alpha, beta, bias = found[0]
             masks.append((alpha, beta, bias))
         return masks
 
-    def generate_samples(self, num_samples, alpha):
+    def generate_samples(self, num_samples, alpha, rng=None):
         """
         Diese Methode generiert die benötigten Textpaare für die
         Kryptoanalyse, indem zufällige 16-Bit-Bitstrings generiert
-        werden, welche anschliessend mit dem SPN verschlüsselt
-        werden.
+        werden, welche anschliessend gemeinsam mit dem SPN (encrypt_batch)
+        verschlüsselt werden.
 
-        Die Textpaare werden in Form einer Liste zurückgegeben.
+        Die Textpaare werden als zwei parallele uint16-Arrays zurückgegeben,
+        bei linearer Variante als LinearSamples(pt, ct), bei differentieller
+        Variante als DiffSamples(ct, ct_alpha).
 
         Args:
             num_samples: Anzahl der zu generierenden Textpaare
+            alpha: Eingabedifferenz (nur differentielle Variante)
+            rng: optionaler Zufallszahlengenerator anstelle von self.rng, z.B. für Pool-Prozesse
         """
-        if self.variant == 'linear':
-            plaintexts = [random.randint(0, 0xFFFF) for _ in range(num_samples)]
-            ciphertexts = [self.spn.encrypt(pt, self.spn.rounds) for pt in plaintexts]
+        if rng is None:
+            rng = self.rng
+        plaintexts = rng.integers(0, 1 << 16, size=num_samples, dtype=np.uint16)
+        ciphertexts = self.spn.encrypt_batch(plaintexts, self.spn.rounds)
 
-            samples = list(zip(plaintexts, ciphertexts))
-            return samples
+        if self.variant == 'linear':
+            return LinearSamples(plaintexts, ciphertexts)
 
         if self.variant == 'differential':
-            plaintexts = [random.randint(0, 0xFFFF) for _ in range(num_samples)]
-            ciphertexts = [self.spn.encrypt(pt, self.spn.rounds) for pt in plaintexts]
-
-            plaintexts_alpha = [pt ^ alpha for pt in plaintexts]
-            ciphertexts_alpha = [self.spn.encrypt(pt_alpha, self.spn.rounds) for pt_alpha in plaintexts_alpha]
-
-            samples = list(zip(ciphertexts, ciphertexts_alpha))
-            return samples
\ No newline at end of file
+            ciphertexts_alpha = self.spn.encrypt_batch(plaintexts ^ np.uint16(alpha), self.spn.rounds)
+            return DiffSamples(ciphertexts, ciphertexts_alpha)
\ No newline at end of file
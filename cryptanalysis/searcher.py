@@ -1,5 +1,8 @@
 from z3 import *
-from functools import reduce
+from functools import reduce, lru_cache
+from bisect import bisect_left
+import math
+import numpy as np
 
 """
 
@@ -11,6 +14,74 @@ löst und somit qualitativ hochwertige Charakteristiken findet.
 """
 
 
+@lru_cache(maxsize=None)
+def _lat_ddt(sbox, variant):
+    """
+    Diese Hilfsfunktion erstellt den "LAT" oder "DDT" für die
+    gegebene S-Box und speichert also für jede Eingabe- und
+    Ausgabekombination bei linearer Variante den Bias und bei
+    differentieller Variante die Wahrscheinlichkeit. Die Treffer
+    werden mit NumPy für alle Kombinationen (alpha, beta, x)
+    gleichzeitig gezählt.
+
+    Falls der Bias oder die Wahrscheinlichkeit Null ist, wird
+    der Wert durch einen sehr kleinen Wert ungleich Null ersetzt,
+    da der Z3-Solver die Summe der Logarithmen optimiert und
+    log2(0) nicht definiert ist.
+
+    Da die Tabelle nur von der S-Box und der Variante abhängt,
+    wird sie zwischengespeichert und von allen Instanzen des
+    CharacteristicSearcher wiederverwendet.
+
+    Args:
+        sbox: S-Box als Tupel
+        variant: Art der Analyse; linear oder differentiell.
+    """
+    sbox = np.array(sbox)
+    alpha = np.arange(16)[:, None, None]
+    beta = np.arange(16)[None, :, None]
+    x = np.arange(16)[None, None, :]
+
+    if variant == 'linear':
+        parity = (np.bitwise_count(alpha & x) ^ np.bitwise_count(beta & sbox[x])) & 1
+        counts = np.count_nonzero(parity == 0, axis=2)
+    if variant == 'differential':
+        counts = np.count_nonzero((sbox[x] ^ sbox[x ^ alpha]) == beta, axis=2)
+
+    table = {}
+    for a in range(16):
+        for b in range(16):
+            prob = int(counts[a, b]) / 16
+
+            if variant == 'linear':
+                table[(a, b)] = prob - 0.5 if prob - 0.5 != 0.0 else 0.000001
+            if variant == 'differential':
+                table[(a, b)] = prob if prob != 0 else 0.000001
+    return table
+
+
+LOG_SCALE = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def _achievable_scores(weights, num_terms):
+    """
+    Diese Hilfsfunktion bestimmt alle Werte, welche eine Summe von
+    num_terms Gewichten aus weights annehmen kann, und gibt diese
+    aufsteigend sortiert zurück. Diese Werte dienen als Schranken
+    für die binäre Suche im Z3-Solver.
+
+    Args:
+        weights: Tupel der verschiedenen ganzzahligen Gewichte
+        num_terms: Anzahl Summanden (S-Boxen)
+    """
+    weights = np.array(weights, dtype=np.int64)
+    scores = np.zeros(1, dtype=np.int64)
+    for _ in range(num_terms):
+        scores = np.unique((scores[:, None] + weights[None, :]).ravel())
+    return scores.tolist()
+
+
 class CharacteristicSearcher:
     """
     Diese Klasse analysiert ein SPN auf seine Schwachstellen, um daraus qualitativ
@@ -22,7 +93,9 @@ class CharacteristicSearcher:
 
     Die Klasse erstellt ein Optimierungsmodell, welches die kryptographische Struktur
     dem SMT-Solver Z3 schildert, um Charakteristiken mit maximalem Bias (linear),
-    respektive maximaler Wahrscheinlichkeit (differentiell) zu finden.
+    respektive maximaler Wahrscheinlichkeit (differentiell) zu finden. Anstelle der
+    Optimize-Engine wird ein Solver verwendet, dessen Schranke für das Ziel binär
+    gesucht wird.
     """
     def __init__(self, spn, num_rounds: int, variant='linear', max_active_sboxes: int = None):
         """
@@ -42,46 +115,17 @@ class CharacteristicSearcher:
         self.nibbles = 4
         self.n = 4
 
-        self.look_up_table = self._compute_look_up_table()
-        self.solver = Optimize()
+        self.look_up_table = _lat_ddt(tuple(spn.sbox), variant)
+        self.log_table = {key: round(math.log2(abs(v)) * LOG_SCALE) for key, v in self.look_up_table.items()}
+        self.log_groups = {}
+        for (a, b), v in self.log_table.items():
+            self.log_groups.setdefault(v, []).append((a << 4) | b)
+        self.negative_indices = [(a << 4) | b for (a, b), v in self.look_up_table.items() if v < 0]
+        self.scores = _achievable_scores(tuple(self.log_groups), num_rounds * 4)
+        self.solver = Solver()
         self._define_variables()
         self._add_constraints()
 
-    def _compute_look_up_table(self):
-        """
-        Diese Hilfsmethode erstellt den "LAT" oder "DDT" für die
-        S-Box der SPN-Instanz und speichert also für jede Eingabe-
-        und Ausgabekombination bei linearer Variante den Bias und
-        bei differentieller Variante die Wahrscheinlichkeit.
-
-        Falls der Bias oder die Wahrscheinlichkeit Null ist, wird
-        der Wert durch einen sehr kleinen Wert ungleich Null ersetzt,
-        um ein Nullprodukt zu vermeiden, da der Z3-Solver das Produkt
-        optimiert.
-        """
-        sbox = self.spn.sbox
-        table = {}
-        for alpha in range(16):
-            for beta in range(16):
-                count = 0
-                for x in range(16):
-                    if self.variant == 'linear':
-                        in_parity = bin(alpha & x).count("1") % 2
-                        out_parity = bin(beta & sbox[x]).count("1") % 2
-                        if in_parity == out_parity:
-                            count += 1
-                    if self.variant == 'differential':
-                        dy = sbox[x] ^ sbox[x ^ alpha]
-                        if dy == beta:
-                            count += 1
-                prob = count / 16
-
-                if self.variant == 'linear':
-                    table[(alpha, beta)] = prob - 0.5 if prob - 0.5 != 0.0 else 0.000001
-                if self.variant == 'differential':
-                    table[(alpha, beta)] = prob if prob != 0 else 0.000001
-        return table
-
     def _define_variables(self):
         """
         Definiert Z3-Variablen:
@@ -93,6 +137,22 @@ class CharacteristicSearcher:
         self.out_masks = [BitVec(f"out_{r}", 16) for r in range(self.num_rounds + 1)]
         self.active_sboxes_per_round = []
 
+    def _look_up(self, index):
+        """
+        Diese Hilfsmethode drückt den "LAT" oder "DDT" als If-Kette über
+        den 8-Bit-Index (Eingabenibble << 4) | Ausgabenibble aus. Indizes
+        mit demselben Logarithmus werden in einer Bedingung zusammengefasst,
+        sodass die Kette nur so lang ist wie die Anzahl verschiedener Werte.
+
+        Args:
+            index: Z3-Bitvektor mit 8 Bit
+        """
+        (*groups, (default, _)) = sorted(self.log_groups.items())
+        expr = IntVal(default)
+        for value, indices in reversed(groups):
+            expr = If(Or([index == k for k in indices]), IntVal(value), expr)
+        return expr
+
     def _add_constraints(self):
         """
         Diese Methode fügt dem Optimierungsmodell Nebenbedingungen hinzu.
@@ -100,8 +160,22 @@ class CharacteristicSearcher:
         festgelegt, die Permutation gefordert und die Nullmasken-Konfiguration 
         vermieden. Andererseits wird das globale Optimierungsziel festgelegt, 
         wobei optional die Anzahl aktiver S-Boxen festgelegt werden kann.
+
+        Anstelle des Produkts der Bias-, bzw. Wahrscheinlichkeitswerte wird die
+        Summe deren Logarithmen (log2 des Betrags) maximiert, wodurch das Ziel
+        linear wird und dasselbe Optimum besitzt. Die Logarithmen werden mit
+        LOG_SCALE skaliert und gerundet, sodass das Ziel eine ganzzahlige
+        Summe ist. Bei linearer Variante wird
+        das Vorzeichen separat verfolgt, sodass nur Charakteristiken mit
+        positivem Gesamtbias zugelassen werden. Existiert keine solche
+        Charakteristik, findet search_best_characteristic keine Lösung.
+
+        Die Werte der S-Box werden über den Index Concat(Eingabenibble,
+        Ausgabenibble) aus einer If-Kette gelesen (_look_up), anstatt für
+        jede der 256 Kombinationen eine eigene Disjunktion anzulegen.
         """
         prob_terms = []
+        negative_terms = []
         for r in range(self.num_rounds):
             active_sboxes = []
             constraints = []
@@ -112,13 +186,17 @@ class CharacteristicSearcher:
                 
                 constraints.append(Implies(in_nib == 0, out_nib == 0))
 
-                prob = Real(f"prob_r{r}_n{i}")
-                val = []
-                for (a, b), v in self.look_up_table.items():
-                    val.append(And(in_nib == a, out_nib == b, prob == v))
-                self.solver.add(Or(*val))
+                index = Concat(in_nib, out_nib)
+
+                prob = Int(f"log_prob_r{r}_n{i}")
+                self.solver.add(prob == self._look_up(index))
                 prob_terms.append(prob)
 
+                if self.variant == 'linear':
+                    negative = Bool(f"negative_r{r}_n{i}")
+                    self.solver.add(negative == Or([index == k for k in self.negative_indices]))
+                    negative_terms.append(negative)
+
                 is_active = Bool(f"active_r{r}_sbox_{i}")
                 self.solver.add(is_active == (in_nib != 0))
                 active_sboxes.append(is_active)
@@ -130,10 +208,11 @@ class CharacteristicSearcher:
                 bit = Extract(i, i, self.out_masks[r])
                 self.solver.add(Extract(self.spn.pbox[i], self.spn.pbox[i], self.in_masks[r + 1]) == bit)
 
-        total_bias = Real("total_bias")
-        product_expr = reduce(lambda x, y: x * y, prob_terms)
-        self.solver.add(total_bias == product_expr)
-        self.solver.maximize(total_bias)
+        self.total_log_bias = Int("total_log_bias")
+        self.solver.add(self.total_log_bias == Sum(prob_terms))
+
+        if self.variant == 'linear':
+            self.solver.add(Not(reduce(Xor, negative_terms)))
 
         if self.max_active_sboxes is not None:
             all_active = [b for r in self.active_sboxes_per_round for b in r]
@@ -144,6 +223,50 @@ class CharacteristicSearcher:
 
         self.prob_terms = prob_terms
 
+    def _characteristic_bias(self, model):
+        """
+        Diese Hilfsmethode berechnet den Bias, bzw. die Wahrscheinlichkeit
+        der im Modell gefundenen Charakteristik als Produkt der Werte des
+        "LAT" oder "DDT" aller S-Boxen.
+
+        Args:
+            model: Modell des Z3-Solvers
+        """
+        bias_product = 1.0
+        for r in range(self.num_rounds):
+            in_mask = model.evaluate(self.in_masks[r], model_completion=True).as_long()
+            out_mask = model.evaluate(self.out_masks[r], model_completion=True).as_long()
+            for i in range(4):
+                in_nib = (in_mask >> (i * 4)) & 0xF
+                out_nib = (out_mask >> (i * 4)) & 0xF
+                bias_product *= self.look_up_table[(in_nib, out_nib)]
+        return bias_product
+
+    def _maximize(self, model):
+        """
+        Diese Hilfsmethode sucht ausgehend von einem gültigen Modell das
+        Modell mit maximaler Summe der Logarithmen. Dazu wird binär über
+        die erreichbaren Werte (self.scores) gesucht und jeweils geprüft,
+        ob ein Modell mit mindestens diesem Wert existiert.
+
+        Args:
+            model: gültiges Modell des Z3-Solvers
+        """
+        lo = bisect_left(self.scores, model.evaluate(self.total_log_bias).as_long())
+        hi = len(self.scores) - 1
+
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            self.solver.push()
+            self.solver.add(self.total_log_bias >= self.scores[mid])
+            if self.solver.check() == sat:
+                model = self.solver.model()
+                lo = bisect_left(self.scores, model.evaluate(self.total_log_bias).as_long())
+            else:
+                hi = mid - 1
+            self.solver.pop()
+        return model
+
     def add_mandatory_nibble(self, required_blocks: list):
         """
         Diese Methode erzwingt optional, dass bestimmte Nibbles
@@ -176,7 +299,7 @@ class CharacteristicSearcher:
                 print("Keine gültige Approximation gefunden mit den gegebenen Bedingungen.")
                 break
 
-            model = self.solver.model()
+            model = self._maximize(self.solver.model())
             alpha = model.evaluate(self.in_masks[0]).as_long()
             beta = model.evaluate(self.in_masks[-1]).as_long()
 
@@ -185,9 +308,7 @@ class CharacteristicSearcher:
                 continue
             seen.add((alpha, beta))
 
-            total_bias = model.evaluate(Real("total_bias"))
-            bias_float = total_bias.numerator_as_long() / total_bias.denominator_as_long()
-            bias_product = bias_float
+            bias_product = self._characteristic_bias(model)
 
             results.append((alpha, beta, bias_product))
 
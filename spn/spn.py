@@ -9,69 +9,93 @@ mit sich bringt. Anstelle der Permutation in letzter Runde wird abermals ein Key
 
 """
 
+from array import array
+import numpy as np
+
 
 class SPN:
     def __init__(self, sbox, pbox, round_keys, rounds):
         """
         Initialisiert das SPN, wobei die inverse S-Box und
-        P-Box für die Entschlüsselung erstellt werden.
+        P-Box für die Entschlüsselung erstellt werden. Zudem werden
+        für Substitution und Permutation sowie deren Inversen
+        Lookup-Tabellen über alle 16-Bit-Zustände vorberechnet.
+        Alle Tabellen werden als array('H') gespeichert.
         """
-        self.sbox = sbox
-        self.inv_sbox = [0] * 16
+        self.sbox = array('H', sbox)
+        self.inv_sbox = array('H', [0] * 16)
         for i, val in enumerate(sbox):
             self.inv_sbox[val] = i
 
-        self.pbox = pbox
-        self.inv_pbox = [0] * 16
+        self.pbox = array('H', pbox)
+        self.inv_pbox = array('H', [0] * 16)
         for i, val in enumerate(pbox):
             self.inv_pbox[val] = i
 
+        self.sbox16 = self._substitution_table(self.sbox)
+        self.inv_sbox16 = self._substitution_table(self.inv_sbox)
+        self.pbox16 = self._permutation_table(self.pbox)
+        self.inv_pbox16 = self._permutation_table(self.inv_pbox)
+
         self.rounds = rounds
         self.round_keys = round_keys
 
+    @staticmethod
+    def _substitution_table(box):
+        """
+        Erstellt eine Lookup-Tabelle für alle 2^16 Zustände, welche
+        die Substitution jedes Nibbles gemäss der gegebenen S-Box
+        zusammenfasst. Die Tabelle wird aus zwei 8-Bit-Teiltabellen
+        zusammengesetzt.
+        """
+        low = [box[b & 0xF] | (box[b >> 4] << 4) for b in range(256)]
+        high = [val << 8 for val in low]
+        return array('H', [h | l for h in high for l in low])
+
+    @staticmethod
+    def _permutation_table(box):
+        """
+        Erstellt eine Lookup-Tabelle für alle 2^16 Zustände, welche
+        die Permutation jedes Bits gemäss der gegebenen P-Box zusammen-
+        fasst. Die Tabelle wird aus den permutierten Bits des unteren
+        und oberen Bytes zusammengesetzt.
+        """
+        low = [0] * 256
+        high = [0] * 256
+        for b in range(256):
+            for i in range(8):
+                bit = (b >> i) & 1
+                low[b] |= bit << box[i]
+                high[b] |= bit << box[i + 8]
+        return array('H', [h | l for h in high for l in low])
+
     def _substitution(self, state):
         """
         Führt Substitutionsvorgang durch, wobei jedes
         Nibble (4-Bit-Block) gemäss der S-Box Tabelle ersetzt wird.
         """
-        output = 0
-        for i in range(4):
-            nibble = (state >> (i * 4)) & 0xF
-            output |= self.sbox[nibble] << (i * 4)
-        return output
+        return self.sbox16[state]
 
     def _inv_substitution(self, state):
         """
         Führt den inversen Substitutionsvorgang durch, wobei jedes
         Nibble gemäss der inversen S-Box Tabelle ersetzt wird.
         """
-        output = 0
-        for i in range(4):
-            nibble = (state >> (i * 4)) & 0xF
-            output |= self.inv_sbox[nibble] << (i * 4)
-        return output
+        return self.inv_sbox16[state]
 
     def _permutation(self, state):
         """
         Führt Permutationsvorgang durch, wobei jedes
         Bit gemäss der P-Box Tabelle vertauscht wird.
         """
-        permuted = 0
-        for i in range(16):
-            bit = (state >> i) & 1
-            permuted |= bit << self.pbox[i]
-        return permuted
+        return self.pbox16[state]
 
     def _inv_permutation(self, state):
         """
         Führt inversen Permutationsvorgang durch, wobei jedes
         Bit gemäss der inversen P-Box Tabelle vertauscht wird.
         """
-        permuted = 0
-        for i in range(16):
-            bit = (state >> i) & 1
-            permuted |= bit << self.inv_pbox[i]
-        return permuted
+        return self.inv_pbox16[state]
 
     def encrypt(self, plaintext, num_rounds):
         """
@@ -90,6 +114,26 @@ class SPN:
         state ^= self.round_keys[num_rounds]
         return state
 
+    def encrypt_batch(self, plaintexts, num_rounds):
+        """
+        Verschlüsselt ein NumPy-Array beliebig vieler Klartexte (16-Bit)
+        gleichzeitig. Die Schritte entsprechen denjenigen von encrypt,
+        wobei Substitution und Permutation über die vorberechneten
+        Lookup-Tabellen auf das gesamte Array angewendet werden. Danach
+        wird das Array der Geheimtexte ausgegeben.
+        """
+        sbox16 = np.asarray(self.sbox16, dtype=np.uint16)
+        pbox16 = np.asarray(self.pbox16, dtype=np.uint16)
+
+        state = np.array(plaintexts, dtype=np.uint16)
+        for i in range(1, num_rounds + 1):
+            state ^= np.uint16(self.round_keys[i - 1])
+            state = sbox16[state]
+            if i != num_rounds:
+                state = pbox16[state]
+        state ^= np.uint16(self.round_keys[num_rounds])
+        return state
+
     def decrypt(self, ciphertext, num_rounds):
         """
         Entschlüsselt einen beliebigen Geheimtext (16-Bit), indem
@@ -2,6 +2,7 @@ import time
 from spn.spn import SPN
 from cryptanalysis.framework import FrameworkProvider
 from cryptanalysis.cryptanalysis import Cryptanalysis
+from cryptanalysis._kernel import set_num_threads
 from multiprocessing import Pool, cpu_count
 import matplotlib.pyplot as plt
 import numpy as np
@@ -9,9 +10,11 @@ import numpy as np
 
 class SuccessVsSamples:
     def _run_single_attack(self, args):
-        num_samples, attack, true_key = args
+        num_samples, attack, true_key, sample_pool = args
+        samples_per_char = [(alpha, beta, samples._make(arr[:num_samples] for arr in samples))
+                            for alpha, beta, samples in sample_pool]
         start = time.time()
-        guessed_key = attack.find_last_round_key(num_samples)
+        guessed_key = attack.find_last_round_key_from_samples(samples_per_char)
         end = time.time()
         success = guessed_key == true_key
         return (success, end - start)
@@ -35,10 +38,17 @@ class SuccessVsSamples:
             framework = FrameworkProvider(spn, num_rounds_char=3, variant=variant, max_active_sboxes=3)
             attack = Cryptanalysis(framework)
 
+            characteristics = framework.generate_characteristics()
+            max_samples = max(sample_steps)
+            sample_pools = [
+                [(alpha, beta, framework.generate_samples(max_samples, alpha)) for alpha, beta, _ in characteristics]
+                for _ in range(repeats)
+            ]
+
             for i in sample_steps:
-                args = [(i, attack, true_key)] * repeats
+                args = [(i, attack, true_key, sample_pool) for sample_pool in sample_pools]
 
-                with Pool(processes=cpu_count()) as pool:
+                with Pool(processes=cpu_count(), initializer=set_num_threads, initargs=(1,)) as pool:
                     results = pool.map(self._run_single_attack, args)
 
                 correct_count = sum(1 for success, _ in results if success)